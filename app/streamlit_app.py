@@ -12,8 +12,13 @@ Per ogni recensione predice:
 import streamlit as st
 import pandas as pd
 import datetime as dt
-from joblib import load
 import io
+import sys
+from pathlib import Path
+
+# Rende importabili i moduli in src/ (es. model_store)
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+from model_store import ModelStore
 
 # Configurazione della pagina Streamlit
 st.set_page_config(page_title="Hotel Review Classifier", layout="centered")
@@ -22,18 +27,20 @@ st.title("Hotel Review Classifier + Sentiment Analysis")
 @st.cache_resource
 def load_models():
     """
-    Carica i modelli di classificazione pre-addestrati.
+    Crea il contenitore dei modelli di classificazione pre-addestrati.
     
-    Usa @st.cache_resource per caricare i modelli una sola volta
-    e condividerli tra tutte le sessioni utente, ottimizzando le performance.
+    Usa @st.cache_resource per creare il contenitore una sola volta
+    e condividerlo tra tutte le sessioni utente. Il contenitore controlla
+    in background i file in models/ e, dopo un nuovo train.py, carica e
+    pre-riscalda i modelli aggiornati prima di sostituirli atomicamente.
     
     Returns:
-        tuple: (department_classifier, sentiment_classifier) - I due modelli caricati
+        ModelStore: Contenitore con la coppia di modelli attiva
     """
-    return load("models/department_classifier.joblib"), load("models/sentiment_classifier.joblib")
+    return ModelStore().start()
 
-# Carica i modelli all'avvio dell'applicazione (con caching)
-DEPARTMENT, SENTIMENT = load_models()
+# Legge la coppia di modelli attiva a ogni esecuzione dello script (con caching del contenitore)
+DEPARTMENT, SENTIMENT = load_models().get()
 
 def clean(s):
     """
@@ -4,16 +4,15 @@ Modulo per l'inferenza dei modelli di classificazione.
 Carica i modelli pre-addestrati e fornisce funzioni per predire
 il reparto e il sentiment di recensioni singole o batch.
 """
+import numpy as np
 import pandas as pd
 from pathlib import Path
-from joblib import load
+from model_store import ModelStore
 from utils import basic_clean
 
-# Carica il modello di classificazione del reparto (Housekeeping, Reception, F&B)
-DEPARTMENT = load("models/department_classifier.joblib")
-
-# Carica il modello di classificazione del sentiment (positive, negative)
-SENTIMENT = load("models/sentiment_classifier.joblib")
+# Carica la coppia di modelli di reparto (Housekeeping, Reception, F&B) e sentiment (positive, negative).
+# I processi di lunga durata possono chiamare STORE.start() per ricaricarli a caldo dopo train.py
+STORE = ModelStore()
 
 def predict_one(title: str, body: str):
     """
@@ -29,6 +28,9 @@ def predict_one(title: str, body: str):
     # Concatena title e body gestendo valori None, poi applica il preprocessing
     text = basic_clean((title or "") + " " + (body or ""))
     
+    # Legge una sola volta la coppia attiva, così un eventuale swap non mescola versioni
+    DEPARTMENT, SENTIMENT = STORE.get()
+    
     # Predice il reparto usando il primo modello
     dept = DEPARTMENT.predict([text])[0]
     
@@ -37,17 +39,73 @@ def predict_one(title: str, body: str):
     
     return dept, sent
 
-def predict_csv(input_csv: str, output_csv: str = "outputs/predictions_batch.csv"):
+def explain_batch(pipe, texts, top_k: int = 3):
+    """
+    Predice le classi di un batch e spiega ogni decisione con i top-k n-grammi.
+    
+    Sfrutta la linearità dei classificatori (LinearSVC / LogisticRegression):
+    il contributo di un n-gramma alla classe predetta è peso TF-IDF × coefficiente.
+    I contributi di tutte le righe sono calcolati con un unico prodotto elementwise
+    sulla matrice sparsa, senza cicli per recensione.
+    
+    Args:
+        pipe (Pipeline): Pipeline addestrata con step 'vectorizer' e 'classifier'
+        texts (iterable): Testi già preprocessati con basic_clean
+        top_k (int): Numero massimo di n-grammi da riportare per riga (default: 3)
+    
+    Returns:
+        tuple: (predictions, explanations) - Classi predette e stringhe
+        "ngramma (contributo); ..." con i soli contributi positivi. Una stringa
+        vuota indica che nessun n-gramma della riga ha contribuito positivamente
+        alla classe predetta (es. nessun termine presente nel vocabolario), per cui
+        la decisione dipende solo dall'intercetta del classificatore
+    """
+    vectorizer = pipe.named_steps["vectorizer"]
+    clf = pipe.named_steps["classifier"]
+    
+    # Una sola trasformazione TF-IDF, riusata sia per la predizione sia per la spiegazione
+    X = vectorizer.transform(texts).tocsr()
+    pred = clf.predict(X)
+    
+    # Indice di riga per ogni elemento non nullo della matrice CSR
+    rows = np.repeat(np.arange(X.shape[0]), np.diff(X.indptr))
+    
+    if clf.coef_.shape[0] == 1:
+        # Caso binario: un solo vettore di coefficienti, positivo verso classes_[1]
+        sign = np.where(pred == clf.classes_[1], 1.0, -1.0)
+        contrib = X.data * clf.coef_[0, X.indices] * sign[rows]
+    else:
+        # Caso multiclasse (one-vs-rest): usa la riga di coefficienti della classe predetta
+        class_idx = np.searchsorted(clf.classes_, pred)
+        contrib = X.data * clf.coef_[class_idx[rows], X.indices]
+    
+    # Ordina i contributi in modo decrescente all'interno di ogni riga
+    order = np.lexsort((-contrib, rows))
+    rank = np.arange(len(order)) - X.indptr[rows[order]]
+    keep = order[(rank < top_k) & (contrib[order] > 0)]
+    
+    # Compone le stringhe di spiegazione (al più top_k elementi per riga)
+    terms = vectorizer.get_feature_names_out()
+    explanations = [[] for _ in range(X.shape[0])]
+    for r, term, value in zip(rows[keep], terms[X.indices[keep]], contrib[keep]):
+        explanations[r].append(f"{term} ({value:.3f})")
+    
+    return pred, ["; ".join(e) for e in explanations]
+
+def predict_csv(input_csv: str, output_csv: str = "outputs/predictions_batch.csv", explain_top_k: int = 0):
     """
     Funzione per predire reparto e sentiment per un batch di recensioni da file CSV.
     
     Args:
         input_csv (str): Percorso del file CSV di input con colonne 'title' e 'body'
         output_csv (str): Percorso del file CSV di output (default: outputs/predictions_batch.csv)
+        explain_top_k (int): Se > 0, aggiunge le colonne di spiegazione con i top-k
+            n-grammi che hanno determinato ciascuna predizione (default: 0 = disattivato)
     
     Output:
         Salva un CSV contenente le colonne originali più predicted_department,
-        predicted_sentiment e timestamp della predizione.
+        predicted_sentiment e timestamp della predizione (più department_explanation
+        e sentiment_explanation se explain_top_k > 0).
     """
     # Carica il CSV di input
     df = pd.read_csv(input_csv)
@@ -55,11 +113,19 @@ def predict_csv(input_csv: str, output_csv: str = "outputs/predictions_batch.csv
     # Prepara i testi combinando title e body, gestisce valori NaN
     texts = (df["title"].fillna("") + " " + df["body"].fillna("")).map(basic_clean)
     
-    # Esegue predizioni in batch per il reparto
-    df["predicted_department"] = DEPARTMENT.predict(texts)
+    # Usa la stessa coppia di modelli per tutto il batch
+    DEPARTMENT, SENTIMENT = STORE.get()
     
-    # Esegue predizioni in batch per il sentiment
-    df["predicted_sentiment"] = SENTIMENT.predict(texts)
+    if explain_top_k > 0:
+        # Predizioni e spiegazioni in batch per entrambi i modelli
+        df["predicted_department"], df["department_explanation"] = explain_batch(DEPARTMENT, texts, explain_top_k)
+        df["predicted_sentiment"], df["sentiment_explanation"] = explain_batch(SENTIMENT, texts, explain_top_k)
+    else:
+        # Esegue predizioni in batch per il reparto
+        df["predicted_department"] = DEPARTMENT.predict(texts)
+        
+        # Esegue predizioni in batch per il sentiment
+        df["predicted_sentiment"] = SENTIMENT.predict(texts)
     
     # Aggiunge timestamp ISO 8601 per tracciare quando è stata fatta la predizione
     df["timestamp"] = pd.Timestamp.now().isoformat()
@@ -73,10 +139,15 @@ def predict_csv(input_csv: str, output_csv: str = "outputs/predictions_batch.csv
     
 if __name__ == "__main__":
     # Entry point per l'esecuzione da linea di comando
-    import sys
+    import argparse
     
-    # Legge il percorso del CSV da riga di comando, altrimenti usa il default
-    input_csv = sys.argv[1] if len(sys.argv) > 1 else "data/samples_to_predict.csv"
+    parser = argparse.ArgumentParser(description="Predizione batch di reparto e sentiment da CSV")
+    # Percorso del CSV da riga di comando, altrimenti usa il default
+    parser.add_argument("input_csv", nargs="?", default="data/samples_to_predict.csv")
+    # Numero di n-grammi esplicativi per riga (0 = nessuna spiegazione)
+    parser.add_argument("--explain", type=int, default=0, metavar="K",
+                        help="aggiunge i top-K n-grammi che motivano ogni predizione")
+    args = parser.parse_args()
     
     # Esegue la predizione batch e salva i risultati
-    predict_csv(input_csv)
+    predict_csv(args.input_csv, explain_top_k=args.explain)
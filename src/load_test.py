@@ -0,0 +1,300 @@
+"""
+Modulo per il load testing end-to-end della predizione.
+
+Riproduce recensioni (sintetiche da generate_dataset.py o da un CSV registrato)
+a un tasso di arrivo fisso in modalità open-loop contro:
+- Il predittore in-process (infer.predict_one)
+- Il percorso batch della CLI (infer.predict_csv su micro-batch)
+- Un endpoint HTTP locale (POST JSON con 'title' e 'body')
+
+Per ogni tasso produce:
+- Istogramma delle latenze corretto per la coordinated omission
+- Report dei percentili e curva throughput vs p99 salvati in outputs/
+"""
+import argparse
+import contextlib
+import io
+import itertools
+import json
+import random
+import tempfile
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+
+# Directory dove salvare report, istogrammi e curva
+OUTPUT_DIRECTORY = Path("outputs"); OUTPUT_DIRECTORY.mkdir(exist_ok=True)
+
+# Percentili riportati per ogni tasso di arrivo
+PERCENTILES = [50, 90, 99, 99.9]
+
+# Bucket logaritmici dell'istogramma: da 10 µs a 100 s, 20 bucket per decade
+HISTOGRAM_BINS = np.logspace(-5, 2, 7 * 20 + 1)
+
+def load_reviews(csv_path=None, n=1000, seed=42):
+    """
+    Prepara le recensioni da riprodurre durante il test.
+
+    Args:
+        csv_path (str): CSV registrato con colonne 'title' e 'body'; se None usa
+            recensioni sintetiche generate con generate_dataset.synthesize_review
+        n (int): Numero di recensioni sintetiche da generare (default: 1000)
+        seed (int): Seed delle recensioni sintetiche, per confrontare run diversi
+            sugli stessi testi (default: 42)
+
+    Returns:
+        list: Lista di tuple (title, body)
+    """
+    if csv_path:
+        df = pd.read_csv(csv_path)
+        return list(zip(df["title"].fillna(""), df["body"].fillna("")))
+
+    from generate_dataset import DEPARTMENTS, SENTIMENTS, synthesize_review
+    # synthesize_review usa il modulo random globale: fissarne il seed rende riproducibili anche i testi
+    random.seed(seed)
+    return [synthesize_review(random.choice(DEPARTMENTS), random.choice(SENTIMENTS)) for _ in range(n)]
+
+def make_target(target: str, url: str = None, batch_size: int = 50, tmp_dir: str = None):
+    """
+    Crea la funzione che esegue una singola richiesta verso il sistema sotto test.
+
+    Args:
+        target (str): 'inproc', 'cli' oppure 'http'
+        url (str): URL dell'endpoint per il target 'http'
+        batch_size (int): Recensioni per richiesta nel target 'cli' (default: 50)
+        tmp_dir (str): Directory per i CSV temporanei del target 'cli', gestita dal chiamante
+
+    Returns:
+        tuple: (request_fn, reviews_per_request) - request_fn riceve una lista di (title, body)
+
+    Raises:
+        ValueError: Se il target non è riconosciuto o mancano URL o directory temporanea
+    """
+    if target == "inproc":
+        from infer import predict_one
+        return (lambda reviews: predict_one(*reviews[0])), 1
+
+    if target == "cli":
+        if not tmp_dir:
+            raise ValueError("The cli target requires a temporary directory")
+        from infer import predict_csv
+        counter = itertools.count()
+
+        def run_batch(reviews):
+            # Ogni richiesta usa file distinti per evitare conflitti tra thread
+            i = next(counter)
+            src, dst = Path(tmp_dir) / f"in_{i}.csv", Path(tmp_dir) / f"out_{i}.csv"
+            pd.DataFrame(reviews, columns=["title", "body"]).to_csv(src, index=False)
+            predict_csv(str(src), str(dst))
+            src.unlink(); dst.unlink()
+        return run_batch, batch_size
+
+    if target == "http":
+        if not url:
+            raise ValueError("The http target requires --url")
+
+        def post(reviews):
+            title, body = reviews[0]
+            req = urllib.request.Request(url, data=json.dumps({"title": title, "body": body}).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+            with urllib.request.urlopen(req, timeout=30) as resp:
+                resp.read()
+        return post, 1
+
+    raise ValueError("Unknown target")
+
+def run_rate(request_fn, reviews, per_request, rate, duration, workers, poisson=False, seed=42):
+    """
+    Esegue un test open-loop a tasso di arrivo fisso.
+
+    Le richieste sono pianificate in anticipo secondo il tasso scelto e inviate
+    all'orario previsto indipendentemente dalle risposte. La latenza è misurata
+    dall'orario di invio previsto (correzione della coordinated omission): il
+    tempo trascorso in coda quando il sistema è saturo viene quindi conteggiato.
+
+    Args:
+        request_fn (callable): Funzione che esegue una richiesta
+        reviews (list): Recensioni (title, body) da riprodurre ciclicamente
+        per_request (int): Recensioni consumate da ogni richiesta
+        rate (float): Richieste al secondo
+        duration (float): Durata del test in secondi
+        workers (int): Numero di thread che eseguono le richieste
+        poisson (bool): Se True usa arrivi di Poisson invece che equispaziati
+        seed (int): Seed per gli arrivi di Poisson
+
+    Returns:
+        dict: Latenze corrette, tempi di servizio, errori e throughput ottenuto
+    """
+    n = max(1, int(rate * duration))
+    if poisson:
+        offsets = np.cumsum(np.random.default_rng(seed).exponential(1.0 / rate, n))
+    else:
+        offsets = np.arange(n) / rate
+
+    latency = np.full(n, np.nan)
+    service = np.full(n, np.nan)
+    errors = []
+
+    def task(i, intended):
+        batch = [reviews[(i * per_request + j) % len(reviews)] for j in range(per_request)]
+        started = time.perf_counter()
+        try:
+            request_fn(batch)
+        except Exception as e:
+            errors.append(repr(e))
+            return
+        finished = time.perf_counter()
+        latency[i] = finished - intended
+        service[i] = finished - started
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        start = time.perf_counter()
+        for i, offset in enumerate(offsets):
+            intended = start + offset
+            delay = intended - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            # Invio non bloccante: se i worker sono occupati la richiesta attende in coda
+            pool.submit(task, i, intended)
+    # Il throughput è calcolato almeno sulla finestra di arrivo pianificata
+    elapsed = max(time.perf_counter() - start, n / rate)
+
+    ok = ~np.isnan(latency)
+    return {
+        "latency": latency[ok],
+        "service": service[ok],
+        "errors": errors,
+        "throughput": ok.sum() * per_request / elapsed,
+    }
+
+def summarize(rate, per_request, result):
+    """
+    Calcola i percentili di latenza per un singolo tasso di arrivo.
+
+    Args:
+        rate (float): Tasso di arrivo offerto (richieste/s)
+        per_request (int): Recensioni per richiesta
+        result (dict): Output di run_rate
+
+    Returns:
+        dict: Riga del report con throughput, percentili (ms) ed errori
+    """
+    row = {
+        "offered_rate": rate,
+        "offered_reviews_per_s": rate * per_request,
+        "throughput_reviews_per_s": result["throughput"],
+        "requests": len(result["latency"]),
+        "errors": len(result["errors"]),
+    }
+    lat_ms = result["latency"] * 1000
+    for p in PERCENTILES:
+        row[f"p{p}_ms"] = np.percentile(lat_ms, p) if len(lat_ms) else np.nan
+    row["max_ms"] = lat_ms.max() if len(lat_ms) else np.nan
+    # p99 non corretto (solo tempo di servizio), utile per vedere l'effetto della correzione
+    row["p99_service_ms"] = np.percentile(result["service"] * 1000, 99) if len(lat_ms) else np.nan
+    return row
+
+def histogram(rate, latency):
+    """
+    Conta le latenze in bucket logaritmici.
+
+    Args:
+        rate (float): Tasso di arrivo offerto
+        latency (np.ndarray): Latenze corrette in secondi
+
+    Returns:
+        pd.DataFrame: Bucket non vuoti con limiti in ms e conteggi
+    """
+    counts, edges = np.histogram(latency, bins=HISTOGRAM_BINS)
+    nz = counts > 0
+    return pd.DataFrame({"offered_rate": rate, "lower_ms": edges[:-1][nz] * 1000,
+                         "upper_ms": edges[1:][nz] * 1000, "count": counts[nz]})
+
+def plot_curve(report, slo_ms, out_png):
+    """
+    Salva la curva throughput vs p99 come immagine PNG.
+
+    Args:
+        report (pd.DataFrame): Report con una riga per tasso di arrivo
+        slo_ms (float): Soglia SLO sul p99 in ms (None per non disegnarla)
+        out_png (str): Nome del file PNG in outputs/
+    """
+    plt.figure()
+    plt.plot(report["throughput_reviews_per_s"], report["p99_ms"], marker="o", label="p99 (corrected)")
+    plt.plot(report["throughput_reviews_per_s"], report["p99_service_ms"], marker="x", linestyle="--",
+             label="p99 (service time only)")
+    if slo_ms:
+        plt.axhline(slo_ms, color="red", linestyle=":", label=f"SLO {slo_ms:g} ms")
+    plt.yscale("log")
+    plt.xlabel("Throughput (reviews/s)")
+    plt.ylabel("Latency (ms)")
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(OUTPUT_DIRECTORY / out_png, dpi=150)
+    plt.close()
+
+def main():
+    """
+    Entry point principale: esegue il test per ogni tasso e salva i report.
+    """
+    parser = argparse.ArgumentParser(description="Load test open-loop con report SLO sulle latenze")
+    parser.add_argument("--target", choices=["inproc", "cli", "http"], default="inproc")
+    parser.add_argument("--url", help="endpoint per il target http (es. http://localhost:8000/predict)")
+    parser.add_argument("--csv", help="CSV registrato con colonne title, body (default: recensioni sintetiche)")
+    parser.add_argument("--rates", default="50,100,200,400", help="richieste/s separate da virgola")
+    parser.add_argument("--duration", type=float, default=10.0, help="secondi per ogni tasso")
+    parser.add_argument("--workers", type=int, default=4, help="thread che eseguono le richieste")
+    parser.add_argument("--batch-size", type=int, default=50, help="recensioni per richiesta nel target cli")
+    parser.add_argument("--poisson", action="store_true", help="arrivi di Poisson invece che equispaziati")
+    parser.add_argument("--slo-ms", type=float, help="soglia SLO sul p99 in ms")
+    parser.add_argument("--seed", type=int, default=42, help="seed delle recensioni sintetiche e degli arrivi")
+    args = parser.parse_args()
+
+    reviews = load_reviews(args.csv, seed=args.seed)
+    # Directory per i CSV temporanei del target cli, rimossa al termine del test
+    with tempfile.TemporaryDirectory(prefix="load_test_") as tmp_dir:
+        request_fn, per_request = make_target(args.target, args.url, args.batch_size, tmp_dir)
+
+        def quiet():
+            # predict_csv stampa una riga per batch: la silenzia durante il test
+            return contextlib.redirect_stdout(io.StringIO()) if args.target == "cli" else contextlib.nullcontext()
+
+        # Riscaldamento: alcune richieste fuori misura per escludere il cold start
+        with quiet():
+            for i in range(5):
+                request_fn(reviews[i * per_request:(i + 1) * per_request] or reviews[:1])
+
+        rows, hists = [], []
+        for rate in [float(r) for r in args.rates.split(",")]:
+            with quiet():
+                result = run_rate(request_fn, reviews, per_request, rate, args.duration, args.workers,
+                                  args.poisson, args.seed)
+            row = summarize(rate, per_request, result)
+            rows.append(row)
+            hists.append(histogram(rate, result["latency"]))
+            print(f"rate={rate:g}/s  throughput={row['throughput_reviews_per_s']:.1f} reviews/s  "
+                  f"p50={row['p50_ms']:.2f}ms  p99={row['p99_ms']:.2f}ms  max={row['max_ms']:.2f}ms  errors={row['errors']}")
+
+    report = pd.DataFrame(rows)
+    report.to_csv(OUTPUT_DIRECTORY / f"load_test_{args.target}.csv", index=False)
+    pd.concat(hists).to_csv(OUTPUT_DIRECTORY / f"load_test_{args.target}_histogram.csv", index=False)
+    plot_curve(report, args.slo_ms, f"load_test_{args.target}.png")
+
+    if args.slo_ms:
+        # Massimo throughput osservato che rispetta lo SLO sul p99
+        within = report[(report["p99_ms"] <= args.slo_ms) & (report["errors"] == 0)]
+        if within.empty:
+            print(f"No tested rate meets p99 <= {args.slo_ms:g} ms")
+        else:
+            best = within.loc[within["throughput_reviews_per_s"].idxmax()]
+            print(f"Max throughput within SLO: {best['throughput_reviews_per_s']:.1f} reviews/s "
+                  f"(offered {best['offered_rate']:g} req/s, p99 {best['p99_ms']:.2f} ms)")
+
+    print(f"Report saved to {OUTPUT_DIRECTORY / f'load_test_{args.target}.csv'}")
+
+if __name__ == "__main__":
+    main()
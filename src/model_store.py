@@ -0,0 +1,171 @@
+"""
+Modulo per la gestione dei modelli nei processi di lunga durata.
+
+Fornisce un contenitore che:
+- Carica la coppia di modelli (reparto, sentiment) da disco
+- Rileva nuove versioni pubblicate da train.py tramite il file manifest
+- Carica e pre-riscalda le nuove versioni in background
+- Sostituisce atomicamente la coppia attiva, mantenendo la precedente in caso di errore
+"""
+import threading
+from joblib import load
+
+# Percorsi di default dei modelli addestrati da train.py
+DEPARTMENT_PATH = "models/department_classifier.joblib"
+SENTIMENT_PATH = "models/sentiment_classifier.joblib"
+
+# Manifest scritto da train.py dopo aver sostituito entrambi i modelli
+MANIFEST_PATH = "models/manifest.json"
+
+# Testi fittizi usati per pre-riscaldare i modelli prima dello swap
+WARMUP_TEXTS = [
+    "camera pulita e personale gentile",
+    "attesa lunghissima al check in",
+    "colazione abbondante ma caffè freddo",
+]
+
+class ModelStore:
+    """
+    Contenitore thread-safe della coppia di modelli attiva con hot reload.
+
+    La coppia (department, sentiment) è conservata in un'unica tupla: get()
+    la legge con una sola assegnazione atomica, quindi le richieste in corso
+    continuano a usare i modelli che hanno ottenuto senza mai bloccarsi,
+    mentre il caricamento della nuova versione avviene in un thread separato.
+    """
+
+    def __init__(self, department_path=DEPARTMENT_PATH, sentiment_path=SENTIMENT_PATH,
+                 manifest_path=MANIFEST_PATH, poll_interval=5.0, warmup_rounds=3):
+        """
+        Carica subito la coppia di modelli corrente, senza pre-riscaldarla.
+
+        Args:
+            department_path (str): Percorso del modello di reparto
+            sentiment_path (str): Percorso del modello di sentiment
+            manifest_path (str): Percorso del manifest che identifica la versione
+            poll_interval (float): Secondi tra due controlli del manifest (default: 5.0)
+            warmup_rounds (int): Predizioni fittizie eseguite in start() e prima
+                di ogni swap (default: 3)
+        """
+        self.paths = (department_path, sentiment_path)
+        self.manifest_path = manifest_path
+        self.poll_interval = poll_interval
+        self.warmup_rounds = warmup_rounds
+
+        # Versione della coppia attiva (contenuto del manifest, None se assente)
+        self.version = self._disk_version()
+
+        # I processi one-shot (CLI) non pagano il costo del riscaldamento
+        self._active = self._load()
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def get(self):
+        """
+        Restituisce la coppia di modelli attiva.
+
+        Returns:
+            tuple: (department_classifier, sentiment_classifier)
+        """
+        return self._active
+
+    def _disk_version(self):
+        """
+        Legge la versione pubblicata da train.py.
+
+        train.py sostituisce entrambi i modelli e solo dopo riscrive il manifest,
+        quindi un cambio di manifest indica sempre una coppia completa su disco.
+
+        Returns:
+            str: Contenuto del manifest, None se il file non esiste
+        """
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        """
+        Carica entrambi i modelli da disco.
+
+        Returns:
+            tuple: (department_classifier, sentiment_classifier)
+        """
+        return tuple(load(path) for path in self.paths)
+
+    def _warm(self, models):
+        """
+        Pre-riscalda i modelli con alcune predizioni fittizie.
+
+        Args:
+            models (tuple): Coppia di modelli da riscaldare
+        """
+        for _ in range(self.warmup_rounds):
+            for model in models:
+                model.predict(WARMUP_TEXTS)
+
+    def check_for_update(self):
+        """
+        Controlla il manifest ed esegue lo swap se è presente una nuova versione.
+
+        Se il caricamento fallisce, o il manifest cambia di nuovo durante il
+        caricamento, resta attiva la coppia precedente.
+
+        Returns:
+            bool: True se la coppia attiva è stata sostituita
+        """
+        with self._reload_lock:
+            current = self._disk_version()
+            if current is None or current == self.version:
+                return False
+
+            try:
+                models = self._load()
+                self._warm(models)
+            except Exception as e:
+                print(f"Model reload failed, keeping previous models: {e!r}")
+                # Non ritenta finché non viene pubblicata una nuova versione
+                self.version = current
+                return False
+
+            # Una pubblicazione concorrente potrebbe aver mescolato le versioni: riprova al prossimo controllo
+            if self._disk_version() != current:
+                return False
+
+            # Swap atomico della coppia attiva
+            self._active = models
+            self.version = current
+            print(f"Models reloaded from {', '.join(self.paths)}")
+            return True
+
+    def _watch(self):
+        """
+        Ciclo del thread di background che controlla periodicamente il manifest.
+        """
+        while not self._stop.wait(self.poll_interval):
+            self.check_for_update()
+
+    def start(self):
+        """
+        Pre-riscalda la coppia attiva e avvia il thread daemon di monitoraggio (idempotente).
+
+        Returns:
+            ModelStore: L'istanza stessa, per concatenare le chiamate
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._warm(self._active)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-store-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Ferma il thread di monitoraggio.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -7,6 +7,8 @@ Addestra due pipeline di machine learning:
 
 Entrambi i modelli usano TF-IDF come feature extraction.
 """
+import json
+import os
 import pandas as pd
 from pathlib import Path
 from joblib import dump
@@ -15,6 +17,7 @@ from sklearn.linear_model import LogisticRegression
 from sklearn.svm import LinearSVC
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics import classification_report
+from model_store import MANIFEST_PATH
 from utils import basic_clean, make_train_test
 
 # Percorso del dataset di training
@@ -67,15 +70,18 @@ def make_pipeline(task: str) -> Pipeline:
 
 def train_model(df, y_col: str, model_name: str):
     """
-    Addestra e valuta un modello di classificazione, poi lo salva su disco.
+    Addestra e valuta un modello di classificazione.
     
     Args:
         df (pd.DataFrame): Dataset completo delle recensioni
         y_col (str): Nome della colonna target ('department' o 'sentiment')
-        model_name (str): Nome del file del modello (senza estensione)
+        model_name (str): Nome del modello mostrato nel report
+    
+    Returns:
+        Pipeline: Pipeline addestrata
     
     Output:
-        Stampa il classification report e salva il modello in models/
+        Stampa il classification report
     """
     # Divide il dataset in train e test set
     train_df, test_df = make_train_test(df, y_col=y_col)
@@ -93,8 +99,31 @@ def train_model(df, y_col: str, model_name: str):
     print (f"\n=== {model_name} ===")
     print (classification_report(test_df[y_col], y_pred, digits=3))
     
-    # Serializza la pipeline addestrata su disco
-    dump(pipe, MODEL_DIRECTORY / f"{model_name}.joblib")
+    return pipe
+
+def save_models(models: dict):
+    """
+    Pubblica su disco i modelli addestrati come un'unica nuova versione.
+    
+    Ogni modello viene scritto su un file temporaneo e poi spostato con
+    os.replace (atomico); per ultimo viene riscritto allo stesso modo il
+    manifest, che i processi in esecuzione (ModelStore) osservano per
+    ricaricare la coppia di modelli solo quando è completa.
+    
+    Args:
+        models (dict): Nome del file del modello (senza estensione) -> pipeline
+    """
+    for model_name, pipe in models.items():
+        path = MODEL_DIRECTORY / f"{model_name}.joblib"
+        tmp = path.with_suffix(".joblib.tmp")
+        dump(pipe, tmp)
+        os.replace(tmp, path)
+    
+    # Il manifest è scritto per ultimo: segnala che la nuova versione è completa
+    manifest = {"version": pd.Timestamp.now().isoformat(), "models": [f"{name}.joblib" for name in models]}
+    tmp = Path(f"{MANIFEST_PATH}.tmp")
+    tmp.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    os.replace(tmp, MANIFEST_PATH)
 
 def main():
     """
@@ -104,10 +133,13 @@ def main():
     df = pd.read_csv(DATA)
     
     # Addestra il classificatore di reparto (3 classi: Housekeeping, Reception, F&B)
-    train_model(df, y_col="department", model_name="department_classifier")
+    department = train_model(df, y_col="department", model_name="department_classifier")
     
     # Addestra il classificatore di sentiment (2 classi: positive, negative)
-    train_model(df, y_col="sentiment", model_name="sentiment_classifier")
+    sentiment = train_model(df, y_col="sentiment", model_name="sentiment_classifier")
+    
+    # Salva entrambi i modelli solo a addestramento completato
+    save_models({"department_classifier": department, "sentiment_classifier": sentiment})
     
 if __name__ == "__main__":
     main()
\ No newline at end of file